@@ -41,6 +41,39 @@ An extension to SQLAlchemy to treat aggregated columns and clauses as Models
 >>> query = GroupUser.join(query)
 >>> result = query.first()
 >>> result.group_name == "A"
+True
+
+the result class is built when a bundle model is first queried, not when it is defined
+
+>>> class UserId(BundleModel):
+...     _id = col(int, User.id)
+...
+>>> "_result_cls" in vars(UserId)
+False
+>>> "_result_cls" in vars(GroupUser)
+True
+
+``process_result`` and ``auto_process_row`` are looked up on every query
+
+>>> class UserName(BundleModel):
+...     name = col(str, User.name)
+...
+...     @classmethod
+...     def process_result(cls, result):
+...         return result.name.upper()
+...
+>>> session.query(UserName).first()
+'JOHN DOE'
+>>> UserName.auto_process_row = False
+>>> session.query(UserName).first()
+UserName(name='John Doe')
+>>> from unittest import mock
+>>> with mock.patch.object(GroupUser, "process_result", classmethod(lambda cls, result: result.name)):
+...     GroupUser.join(session.query(GroupUser)).first()
+...
+'John Doe'
+>>> GroupUser.join(session.query(GroupUser)).first()
+GroupUser(id=1, name='John Doe', group_name='A')
 """
 
 __copyright__ = "Copyright (C) 2021 Yuichiro Smith"
@@ -51,7 +84,8 @@ __url__ = "https://github.com/yu-ichiro/sqlalchemy_bundle_model"
 __status__ = "beta"
 __date__ = "2021/04/18"
 
-from collections import OrderedDict
+from types import CodeType, FunctionType
+from weakref import WeakKeyDictionary, WeakValueDictionary
 from typing import Type, Union, Any, TypeVar, Dict, NamedTuple
 
 try:
@@ -70,48 +104,95 @@ from sqlalchemy.sql.operators import Operators
 T = TypeVar("T")
 
 
+def _compile_proc(body: str) -> CodeType:
+    """
+    compile a row processing function for :meth:`BundleModel.create_row_processor`
+
+    the generated function looks up ``_sp`` (the processor of :class:`Bundle`), ``_rc`` (the result class),
+    ``_pr`` (``process_result``) and ``_tn`` (``tuple.__new__``) from the globals bound on each query
+    """
+    scope = {}
+    exec(compile("def proc(row):\n    " + body + "\n", "<bundle_model>", "exec"), scope)
+    return scope["proc"].__code__
+
+
+_process_proc = _compile_proc("return _pr(_tn(_rc, _sp(row)))")
+_plain_proc = _compile_proc("return _tn(_rc, _sp(row))")
+
+
+_pytype_cache: "WeakKeyDictionary[Any, Any]" = WeakKeyDictionary()
+_SENTINEL = object()
+
+
+def _python_type(type_) -> Any:
+    # keyed by the type instance rather than its class since e.g. Enum and TypeDecorator resolve per instance
+    python_type = _pytype_cache.get(type_, _SENTINEL)
+    if python_type is _SENTINEL:
+        try:
+            python_type = type_.python_type
+        except NotImplementedError:
+            python_type = Any
+        _pytype_cache[type_] = python_type
+    return python_type
+
+
 class Alias(Label):
     def __init__(self, element, name=None, type_=None):
         super().__init__(name, element, type_)
 
     @property
     def ref(self):
-        val = _textual_label_reference(self.name)
+        val = self.__dict__.get("_ref_cache")
+        if val is None:
+            val = self.__dict__["_ref_cache"] = _textual_label_reference(self.name)
         return val
 
     def value_at(self, row):
         return getattr(row, self.name)
 
 
+# type attributes that cannot be re-assigned on a class
+_unsettable = frozenset({"__dict__", "__weakref__"})
+# per-class attributes for row processing, neither inherited by subclasses nor copied to results
+_bundle_internals = frozenset({"_result_cls"})
+
+
 class BundleMeta(Bundle, type):
     single_entity = True
 
     def __init__(cls, name, bases, namespace):
-        cls.__attrs: Dict[str, Alias] = OrderedDict()
-        _namespace = OrderedDict()
+        cls.__attrs: Dict[str, Alias] = {}
+        _namespace = {}
         for base in bases:
             for key, value in base.__dict__.items():
                 if key in _namespace:
-                    _namespace.move_to_end(key)
+                    del _namespace[key]
                 _namespace[key] = value
         for key, value in namespace.items():
             if key in _namespace:
-                _namespace.move_to_end(key)
+                del _namespace[key]
             _namespace[key] = value
         namespace = _namespace
+        attrs, alias_, operators = cls.__attrs, Alias, Operators
         for attr_key, attr_value in namespace.items():
-            if isinstance(attr_value, Operators) and hasattr(attr_value, "_label"):
-                cls.__attrs[attr_key] = namespace[attr_key] = Alias(attr_value, attr_key)
-            if isinstance(attr_value, Alias):
-                cls.__attrs[attr_key] = namespace[attr_key] = attr_value
+            if isinstance(attr_value, alias_):
+                attrs[attr_key] = attr_value
+            elif isinstance(attr_value, operators) and hasattr(attr_value, "_label"):
+                attrs[attr_key] = namespace[attr_key] = alias_(attr_value, attr_key)
         super().__init__(name, *cls.__attrs.values())
         namespace.update(cls.__dict__)
         namespace.update(cls.__attrs)
-        for key, value in namespace.items():
+        cls_dict = cls.__dict__
+        to_set = {
+            key: value for key, value in namespace.items() if key not in cls_dict or cls_dict[key] is not value
+        }
+        for key, value in to_set.items():
+            if key in _unsettable or key in _bundle_internals:
+                continue
             try:
                 setattr(cls, key, value)
-            except:  # noqa
-                pass
+            except (TypeError, AttributeError):
+                continue
             if hasattr(value, "__set_name__"):
                 value.__set_name__(cls, key)  # noqa
         setattr(cls, "__name__", name)
@@ -125,6 +206,10 @@ class BundleMeta(Bundle, type):
         return (self,)
 
 
+# classes created by BundleModel.generate, keyed by the base class and the given attributes in call order
+_generated: "WeakValueDictionary[Any, BundleMeta]" = WeakValueDictionary()
+
+
 class BundleModel(metaclass=BundleMeta):
     """
     A model that can aggregate columns and clauses from different tables and treat it like a orm model
@@ -144,15 +229,17 @@ class BundleModel(metaclass=BundleMeta):
 
         """
         super_proc = Bundle.create_row_processor(cls, query, procs, labels)  # noqa
-        result_cls = BundleResult(cls)
-
-        def proc(row):
-            result = result_cls(*super_proc(row))
-            if not cls.auto_process_row:
-                return result
-            return cls.process_result(result)
-
-        return proc
+        result_cls = _result_class(cls)
+        # checked once per query so that auto_process_row and process_result can still be changed later;
+        # the default process_result returns the row as is, so its call is left out
+        process_result = cls.process_result
+        process = cls.auto_process_row and (
+            getattr(process_result, "__func__", None) is not BundleModel.__dict__["process_result"].__func__
+        )
+        return FunctionType(
+            _process_proc if process else _plain_proc,
+            {"_sp": super_proc, "_rc": result_cls, "_pr": process_result, "_tn": tuple.__new__},
+        )
 
     @classmethod
     def process_result(cls, result):
@@ -160,13 +247,53 @@ class BundleModel(metaclass=BundleMeta):
 
     @classmethod
     def generate(cls: Type[T], **kwargs) -> Type[T]:
-        return BundleMeta(cls.__name__, (cls,), kwargs)  # noqa
+        """
+        a utility function to create a subclass with additional fields
+
+        generated classes are cached by the base class and the given fields in call order,
+        so repeated calls with the same arguments return the same class object;
+        modifying a generated class affects every caller that generates it with the same arguments.
+        a generated class is dropped from the cache once it is no longer referenced.
+
+        >>> from sqlalchemy import column, Integer, Text
+        >>> class Item(BundleModel):
+        ...     id = col(int, column("id", Integer))
+        >>> name, title = col(str, column("name", Text)), col(str, column("title", Text))
+        >>> Item.generate(name=name, title=title) is Item.generate(name=name, title=title)
+        True
+        >>> list(Item.generate(title=title, name=name).aliases)
+        ['id', 'title', 'name']
+        >>> Item.generate(flag=1) is Item.generate(flag=True)
+        False
+        >>> import gc, weakref
+        >>> ref = weakref.ref(Item.generate(name=name))
+        >>> _ = gc.collect()
+        >>> ref() is None
+        True
+
+        :param kwargs: fields to add
+        :return:
+        """
+        try:
+            # kwargs order is the field order of the generated class, and values that compare equal
+            # may still be different (e.g. 1 and True), so both the order and the types are part of the key
+            key = (cls, tuple((key, type(value), value) for key, value in kwargs.items()))
+            hash(key)
+        except TypeError:
+            return BundleMeta(cls.__name__, (cls,), kwargs)  # noqa
+        generated = _generated.get(key)
+        if generated is None:
+            generated = _generated[key] = BundleMeta(cls.__name__, (cls,), kwargs)  # noqa
+        return generated
 
 
 def bundle(class_: Type[T]) -> Type[T]:
     """
-    a utility function to copy fields from another model
+    a utility function to copy fields from another model, in alphabetical order
 
+    >>> from sqlalchemy import Column, BigInteger, Text, ForeignKey
+    >>> from sqlalchemy.orm import declarative_base, relationship
+    >>> Base = declarative_base()
     >>> class User(Base):
     ...     __tablename__ = "users"
     ...     id = Column(BigInteger, primary_key=True)
@@ -175,19 +302,32 @@ def bundle(class_: Type[T]) -> Type[T]:
     ...
     ...     group = relationship("Group")
     ...
+    >>> class Group(Base):
+    ...     __tablename__ = "groups"
+    ...     id = Column(BigInteger, primary_key=True)
+    ...     name = Column(Text, nullable=False)
+    ...
     >>> class A(bundle(User)):
     ...     name = col(str, Group.name)
     >>> A.name is not None and A.id is not None
     True
+    >>> list(bundle(User).aliases)
+    ['group_id', 'id', 'name']
 
     :param class_: model
     :return:
     """
-    namespace = OrderedDict()
-    for attr in dir(class_):
-        if not attr.startswith("_") and attr != "metadata":
-            attr_object = getattr(class_, attr)
+    namespace = {}
+    for base in reversed(class_.__mro__):
+        for attr, attr_object in vars(base).items():
+            if attr.startswith("_") or attr == "metadata":
+                continue
+            if not isinstance(attr_object, Operators) and hasattr(type(attr_object), "__get__"):
+                # resolve non-column descriptors (classmethods, properties, etc.) like attribute access does
+                attr_object = getattr(class_, attr)
             namespace[attr] = attr_object
+    # keep the alphabetical field order dir() used to give
+    namespace = {attr: namespace[attr] for attr in sorted(namespace)}
     return BundleMeta(class_.__name__, (), namespace)  # noqa
 
 
@@ -212,19 +352,16 @@ _prohibited = frozenset(
 
 class BundleResult(NamedTupleMeta, type):
     def __new__(mcs, bundle_cls: BundleMeta):
-        annotations = OrderedDict()
+        annotations = {}
         for name, alias in bundle_cls.aliases.items():
-            try:
-                annotations[name] = alias.type.python_type
-            except NotImplementedError:
-                annotations[name] = Any
-        namespace = OrderedDict()
+            annotations[name] = _python_type(alias.type)
+        namespace = {}
         for base in bundle_cls.__mro__:
             for key, value in base.__dict__.items():
-                if key in _prohibited:
+                if key in _prohibited or key in _bundle_internals:
                     continue
                 if key in namespace:
-                    namespace.move_to_end(key)
+                    del namespace[key]
                 namespace[key] = value
         return super().__new__(
             mcs,
@@ -235,10 +372,29 @@ class BundleResult(NamedTupleMeta, type):
                 "__annotations__": annotations,
                 "__table__": bundle_cls,
                 "__module__": bundle_cls.__module__,
+                "__qualname__": bundle_cls.__qualname__,
+                "__reduce__": _reduce_result,
             },
         )
 
 
+def _result_class(bundle_cls: BundleMeta) -> BundleResult:
+    # built on first use and kept in the bundle class's own __dict__, so subclasses get their own
+    result_cls = bundle_cls.__dict__.get("_result_cls")
+    if result_cls is None:
+        result_cls = bundle_cls._result_cls = BundleResult(bundle_cls)
+    return result_cls
+
+
+def _rebuild_result(bundle_cls: BundleMeta, values: tuple):
+    return tuple.__new__(_result_class(bundle_cls), values)
+
+
+def _reduce_result(result):
+    # the result class shares its name with the bundle class, so pickle it through the bundle class instead
+    return _rebuild_result, (result.__table__, tuple(result))
+
+
 def col(_type: Type[T], column: Operators) -> Union[T, Alias]:
     return column  # type: Any
 